@@ -2,26 +2,63 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
+from typing import Any
 
 import voluptuous as vol
 
 from homeassistant.config_entries import ConfigEntry, SOURCE_IMPORT
-from homeassistant.const import CONF_EMAIL, CONF_PASSWORD, CONF_RADIUS, Platform
-from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse
+from homeassistant.const import (
+    CONF_EMAIL,
+    CONF_PASSWORD,
+    CONF_RADIUS,
+    EVENT_CORE_CONFIG_UPDATE,
+    Platform,
+)
+from homeassistant.core import (
+    Event,
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
 from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
 from homeassistant.helpers.typing import ConfigType
 
-from .emt_madrid import APIEMT
+from .const import CONF_STOP_ID, CONF_STOPS, DEFAULT_RADIUS, DOMAIN, NEARBY_MAX_RESULTS
+from .coordinator import EMTMadridCoordinator
+from .emt_madrid import APIEMT, EMTAuthError
+from .speech import NO_ARRIVALS_SPEECH, join_phrases, speech_phrase
 
 _LOGGER = logging.getLogger(__name__)
 
-DOMAIN = "emt_madrid"
-CONF_STOP_ID = "stop_id"
-CONF_STOPS = "stops"
-
 PLATFORMS: list[Platform] = [Platform.SENSOR]
 
+# Service calls fetching from the EMT API at the same time
+MAX_CONCURRENT_FETCHES = 2
+
+
+def _bounded_int(min_value: int, max_value: int):
+    """Return a validator that coerces to int and checks the range in a single call."""
+
+    def validate(value: Any) -> int:
+        try:
+            number = int(value)
+        except (TypeError, ValueError) as err:
+            raise vol.Invalid(f"expected int, got {value!r}") from err
+        if not min_value <= number <= max_value:
+            raise vol.Invalid(f"value must be between {min_value} and {max_value}")
+        return number
+
+    return validate
+
+
+_RADIUS = _bounded_int(50, 1000)
+_MAX_RESULTS = _bounded_int(1, 20)
+
 # Schema for YAML configuration (legacy support)
 CONFIG_SCHEMA = vol.Schema(
     {
@@ -31,9 +68,7 @@ CONFIG_SCHEMA = vol.Schema(
                 vol.Required(CONF_PASSWORD): cv.string,
                 vol.Optional(CONF_STOP_ID): cv.positive_int,
                 vol.Optional(CONF_STOPS): vol.All(cv.ensure_list, [cv.positive_int]),
-                vol.Optional(CONF_RADIUS, default=300): vol.All(
-                    vol.Coerce(int), vol.Range(min=50, max=1000)
-                ),
+                vol.Optional(CONF_RADIUS, default=DEFAULT_RADIUS): _RADIUS,
             }
         )
     },
@@ -44,14 +79,26 @@ SERVICE_NEARBY_ARRIVALS = "get_nearby_arrivals"
 SERVICE_NEARBY_ARRIVALS_SCHEMA = vol.Schema({
     vol.Optional("latitude"): cv.latitude,
     vol.Optional("longitude"): cv.longitude,
-    vol.Optional("radius", default=300): vol.All(vol.Coerce(int), vol.Range(min=50, max=1000)),
-    vol.Optional("max_results", default=5): vol.All(vol.Coerce(int), vol.Range(min=1, max=20)),
+    # No default radius, calls without one use the radius of the entry
+    vol.Optional("radius"): _RADIUS,
+    vol.Optional("max_results", default=5): _MAX_RESULTS,
 })
 
 
 async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
     """Set up the EMT Madrid component."""
     hass.data.setdefault(DOMAIN, {})
+    hass.data[DOMAIN]["sem"] = asyncio.Semaphore(MAX_CONCURRENT_FETCHES)
+
+    @callback
+    def _async_clear_home_coords(event: Event) -> None:
+        """Forget the cached zone.home coordinates when the home location changes."""
+        hass.data[DOMAIN].pop("home_coords", None)
+
+    hass.bus.async_listen(EVENT_CORE_CONFIG_UPDATE, _async_clear_home_coords)
+
+    # Register services once, they resolve the loaded entry on each call
+    await _async_register_services(hass)
 
     # Check for YAML configuration and import it
     if DOMAIN in config:
@@ -78,7 +125,7 @@ async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
                 data={
                     CONF_EMAIL: yaml_config[CONF_EMAIL],
                     CONF_PASSWORD: yaml_config[CONF_PASSWORD],
-                    CONF_RADIUS: yaml_config.get(CONF_RADIUS, 300),
+                    CONF_RADIUS: yaml_config.get(CONF_RADIUS, DEFAULT_RADIUS),
                     CONF_STOPS: stops,
                 },
             )
@@ -95,39 +142,42 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     api = APIEMT(
         entry.data[CONF_EMAIL],
         entry.data[CONF_PASSWORD],
-        0  # No fixed stop - dynamic
+        0,  # No fixed stop - dynamic
+        session=async_get_clientsession(hass),
     )
 
     # Authenticate
-    await hass.async_add_executor_job(api.authenticate)
-
-    if api._token == "Invalid token":
+    try:
+        await api.async_authenticate()
+    except EMTAuthError:
         _LOGGER.error("Failed to authenticate with EMT Madrid API")
         return False
 
-    # Store API instance and config
+    # Poll the configured location once, shared by the sensor and the service
+    coordinator = EMTMadridCoordinator(hass, api, entry.data)
+    await coordinator.async_config_entry_first_refresh()
+
+    # Store API instance, coordinator and config
     hass.data[DOMAIN][entry.entry_id] = {
         "api": api,
+        "coordinator": coordinator,
         "config": entry.data,
     }
 
-    # Store credentials for service use
-    hass.data[DOMAIN]["credentials"] = {
-        "email": entry.data[CONF_EMAIL],
-        "password": entry.data[CONF_PASSWORD],
-    }
-    hass.data[DOMAIN]["radius"] = entry.data.get(CONF_RADIUS, 300)
-
-    # Register service (only once)
-    if not hass.services.has_service(DOMAIN, SERVICE_NEARBY_ARRIVALS):
-        await _async_register_services(hass)
-
     # Set up platforms
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
+    # The coordinator reads the options once, rebuild it when they change
+    entry.async_on_unload(entry.add_update_listener(_async_update_listener))
+
     return True
 
 
+async def _async_update_listener(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload the config entry after its options changed."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
@@ -148,27 +198,34 @@ async def _async_register_services(hass: HomeAssistant) -> None:
         longitude = call.data.get("longitude")
 
         if latitude is None or longitude is None:
-            zone_home = hass.states.get("zone.home")
-            if zone_home:
-                latitude = zone_home.attributes.get("latitude")
-                longitude = zone_home.attributes.get("longitude")
-            else:
-                return {
-                    "error": "No coordinates provided and zone.home not found",
-                    "arrivals": [],
-                    "speech": "No se pudo determinar la ubicación del hogar.",
-                    "count": 0
-                }
-
-        radius = call.data.get("radius", hass.data[DOMAIN].get("radius", 300))
-        max_results = call.data.get("max_results", 5)
-
-        # Get API instance
-        if DOMAIN in hass.data and "credentials" in hass.data[DOMAIN]:
-            creds = hass.data[DOMAIN]["credentials"]
-            api = APIEMT(creds["email"], creds["password"], 0)
-            await hass.async_add_executor_job(api.authenticate)
-        else:
+            # zone.home rarely moves, resolve it once until the core config changes
+            home_coords = hass.data[DOMAIN].get("home_coords")
+            if home_coords is None:
+                zone_home = hass.states.get("zone.home")
+                if not zone_home:
+                    return {
+                        "error": "No coordinates provided and zone.home not found",
+                        "arrivals": [],
+                        "speech": "No se pudo determinar la ubicación del hogar.",
+                        "count": 0
+                    }
+                home_coords = (
+                    zone_home.attributes.get("latitude"),
+                    zone_home.attributes.get("longitude"),
+                )
+                hass.data[DOMAIN]["home_coords"] = home_coords
+            latitude, longitude = home_coords
+
+        # Use the first loaded entry, its API client is already authenticated
+        entry_data = next(
+            (
+                hass.data[DOMAIN][entry.entry_id]
+                for entry in hass.config_entries.async_entries(DOMAIN)
+                if entry.entry_id in hass.data[DOMAIN]
+            ),
+            None,
+        )
+        if entry_data is None:
             return {
                 "error": "No EMT Madrid credentials configured.",
                 "arrivals": [],
@@ -176,10 +233,31 @@ async def _async_register_services(hass: HomeAssistant) -> None:
                 "count": 0
             }
 
-        # Get nearby arrivals
-        arrivals = await hass.async_add_executor_job(
-            api.get_nearby_arrivals, longitude, latitude, radius, max_results
+        radius = call.data.get("radius", entry_data["config"].get(CONF_RADIUS, DEFAULT_RADIUS))
+        max_results = call.data.get("max_results", 5)
+
+        # Get nearby arrivals, reusing the last poll when it covers this location
+        arrivals = _async_get_polled_arrivals(
+            hass, longitude, latitude, radius, max_results
         )
+        if arrivals is None:
+            # Queue bursts of calls instead of flooding the EMT API
+            async with hass.data[DOMAIN]["sem"]:
+                try:
+                    arrivals, _ = await _async_get_nearby_arrivals(
+                        entry_data, longitude, latitude, radius, max_results
+                    )
+                except EMTAuthError:
+                    _LOGGER.error("EMT Madrid API rejected the configured credentials")
+                    return {
+                        "error": "Invalid EMT Madrid credentials.",
+                        "arrivals": [],
+                        "speech": "Las credenciales de EMT Madrid no son válidas.",
+                        "count": 0
+                    }
+
+        # Service responses must be JSON serializable
+        arrivals = [arrival._asdict() for arrival in arrivals]
 
         # Format for voice response
         speech_text = _format_arrivals_for_speech(arrivals)
@@ -199,40 +277,57 @@ async def _async_register_services(hass: HomeAssistant) -> None:
     )
 
 
+@callback
+def _async_get_polled_arrivals(
+    hass: HomeAssistant, longitude: float, latitude: float, radius: int, max_results: int
+) -> list | None:
+    """Return the arrivals a coordinator already polled for this location, if any."""
+    if max_results > NEARBY_MAX_RESULTS:
+        return None
+
+    for entry in hass.config_entries.async_entries(DOMAIN):
+        entry_data = hass.data[DOMAIN].get(entry.entry_id)
+        if not entry_data:
+            continue
+        coordinator: EMTMadridCoordinator = entry_data["coordinator"]
+        data = coordinator.data
+        if (
+            coordinator.last_update_success
+            and data
+            and data["radius"] == radius
+            and round(data["latitude"], 4) == round(latitude, 4)
+            and round(data["longitude"], 4) == round(longitude, 4)
+        ):
+            return data["nearby"][:max_results]
+
+    return None
+
+
+async def _async_get_nearby_arrivals(
+    entry_data: dict, longitude: float, latitude: float, radius: int, max_results: int
+) -> tuple[list, int]:
+    """Get nearby arrivals, re-authenticating once if the token was rejected."""
+    api: APIEMT = entry_data["api"]
+    token = await api.async_ensure_token()
+    try:
+        return await api.async_get_nearby_arrivals(longitude, latitude, radius, max_results)
+    except EMTAuthError:
+        await api.async_ensure_token(rejected_token=token)
+        return await api.async_get_nearby_arrivals(longitude, latitude, radius, max_results)
+
+
 def _format_arrivals_for_speech(arrivals: list) -> str:
     """Format arrivals list into a voice-friendly string in Spanish."""
     if not arrivals:
-        return "No hay autobuses llegando a paradas cercanas en este momento."
+        return NO_ARRIVALS_SPEECH
 
-    lines_mentioned = set()
-    speech_parts = []
+    # Only the first (soonest) arrival of each line is mentioned
+    phrases: dict[str, str] = {}
 
     for arrival in arrivals:
         line = arrival["line"]
-        minutes = arrival["minutes"]
-        stop_name = arrival.get("stop_name", "")
-
-        if line not in lines_mentioned:
-            if minutes == 0:
-                if stop_name:
-                    speech_parts.append(f"Línea {line} llegando ahora en {stop_name}")
-                else:
-                    speech_parts.append(f"Línea {line} llegando ahora")
-            elif minutes == 1:
-                if stop_name:
-                    speech_parts.append(f"Línea {line} en 1 minuto en {stop_name}")
-                else:
-                    speech_parts.append(f"Línea {line} en 1 minuto")
-            else:
-                if stop_name:
-                    speech_parts.append(f"Línea {line} en {minutes} minutos en {stop_name}")
-                else:
-                    speech_parts.append(f"Línea {line} en {minutes} minutos")
-            lines_mentioned.add(line)
-
-    if len(speech_parts) == 1:
-        return speech_parts[0] + "."
-    elif len(speech_parts) == 2:
-        return f"{speech_parts[0]} y {speech_parts[1]}."
-    else:
-        return ", ".join(speech_parts[:-1]) + f", y {speech_parts[-1]}."
+        if line in phrases:
+            continue
+        phrases[line] = speech_phrase(line, arrival["minutes"], arrival.get("stop_name", ""))
+
+    return join_phrases(list(phrases.values()))
@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import logging
+import re
 from typing import Any
 
 import voluptuous as vol
@@ -11,19 +12,25 @@ from homeassistant.config_entries import ConfigFlow, ConfigFlowResult, OptionsFl
 from homeassistant.const import CONF_EMAIL, CONF_PASSWORD, CONF_RADIUS, CONF_LATITUDE, CONF_LONGITUDE
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.exceptions import HomeAssistantError
-
-from .emt_madrid import APIEMT
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+
+from .const import (
+    CONF_REFRESH_EVERY,
+    CONF_STOPS,
+    CONF_STOPS_DISPLAY,
+    DEFAULT_RADIUS,
+    DEFAULT_REFRESH_EVERY,
+    DOMAIN,
+)
+from .emt_madrid import APIEMT, EMTAuthError
 
 _LOGGER = logging.getLogger(__name__)
 
-DOMAIN = "emt_madrid"
-CONF_STOPS = "stops"
-
 STEP_USER_DATA_SCHEMA = vol.Schema(
     {
         vol.Required(CONF_EMAIL): str,
         vol.Required(CONF_PASSWORD): str,
-        vol.Optional(CONF_RADIUS, default=300): vol.All(
+        vol.Optional(CONF_RADIUS, default=DEFAULT_RADIUS): vol.All(
             vol.Coerce(int), vol.Range(min=50, max=1000)
         ),
         vol.Optional(CONF_LATITUDE): vol.Coerce(float),
@@ -33,15 +40,40 @@ STEP_USER_DATA_SCHEMA = vol.Schema(
 )
 
 
-async def validate_input(hass: HomeAssistant, data: dict[str, Any]) -> dict[str, Any]:
-    """Validate the user input allows us to connect."""
-    api = APIEMT(data[CONF_EMAIL], data[CONF_PASSWORD], 0)
+STOP_ID_PATTERN = re.compile(r"[+-]?\d+")
+
+
+def _parse_stops(stops_str: str) -> list[int]:
+    """Parse a comma-separated list of stop IDs, empty entries allowed."""
+    stops = []
+    for token in stops_str.split(","):
+        token = token.strip()
+        if not token:
+            continue
+        if not STOP_ID_PATTERN.fullmatch(token):
+            raise InvalidStops
+        stops.append(int(token))
+    return stops
 
-    # Run blocking calls in executor
-    await hass.async_add_executor_job(api.authenticate)
 
-    if api._token == "Invalid token":
-        raise InvalidAuth
+async def validate_input(hass: HomeAssistant, data: dict[str, Any]) -> dict[str, Any]:
+    """Validate the user input allows us to connect."""
+    # Skip the login when a loaded entry holds a valid token for these credentials
+    loaded = hass.data.get(DOMAIN, {})
+    if not any(
+        entry.data[CONF_EMAIL] == data[CONF_EMAIL]
+        and entry.data[CONF_PASSWORD] == data[CONF_PASSWORD]
+        and loaded[entry.entry_id]["api"].token_valid
+        for entry in hass.config_entries.async_entries(DOMAIN)
+        if entry.entry_id in loaded
+    ):
+        api = APIEMT(
+            data[CONF_EMAIL], data[CONF_PASSWORD], 0, session=async_get_clientsession(hass)
+        )
+        try:
+            await api.async_authenticate()
+        except EMTAuthError as err:
+            raise InvalidAuth from err
 
     # Check if we have coordinates (custom or from zone.home)
     has_custom_coords = data.get(CONF_LATITUDE) is not None and data.get(CONF_LONGITUDE) is not None
@@ -101,16 +133,10 @@ class EMTMadridConfigFlow(ConfigFlow, domain=DOMAIN):
 
         if user_input is not None:
             # Parse stops from comma-separated string
-            stops_str = user_input.get(CONF_STOPS, "")
-            stops = []
-            for s in stops_str.split(","):
-                s = s.strip()
-                if s:
-                    try:
-                        stops.append(int(s))
-                    except ValueError:
-                        errors["base"] = "invalid_stops"
-                        break
+            try:
+                stops = _parse_stops(user_input.get(CONF_STOPS, ""))
+            except InvalidStops:
+                errors["base"] = "invalid_stops"
 
             if not errors:
                 try:
@@ -131,8 +157,9 @@ class EMTMadridConfigFlow(ConfigFlow, domain=DOMAIN):
                     data = {
                         CONF_EMAIL: user_input[CONF_EMAIL],
                         CONF_PASSWORD: user_input[CONF_PASSWORD],
-                        CONF_RADIUS: user_input.get(CONF_RADIUS, 300),
+                        CONF_RADIUS: user_input.get(CONF_RADIUS, DEFAULT_RADIUS),
                         CONF_STOPS: stops,
+                        CONF_STOPS_DISPLAY: ", ".join(map(str, stops)),
                     }
 
                     # Add custom coordinates if provided
@@ -161,25 +188,20 @@ class EMTMadridOptionsFlow(OptionsFlow):
 
         if user_input is not None:
             # Parse stops from comma-separated string
-            stops_str = user_input.get(CONF_STOPS, "")
-            stops = []
-            if stops_str:
-                for s in stops_str.split(","):
-                    s = s.strip()
-                    if s:
-                        try:
-                            stops.append(int(s))
-                        except ValueError:
-                            errors["base"] = "invalid_stops"
-                            break
+            try:
+                stops = _parse_stops(user_input.get(CONF_STOPS, ""))
+            except InvalidStops:
+                errors["base"] = "invalid_stops"
 
             if not errors:
                 # Build new data, keeping email/password from original config
                 new_data = {
                     CONF_EMAIL: self.config_entry.data[CONF_EMAIL],
                     CONF_PASSWORD: self.config_entry.data[CONF_PASSWORD],
-                    CONF_RADIUS: user_input.get(CONF_RADIUS, 300),
+                    CONF_RADIUS: user_input.get(CONF_RADIUS, DEFAULT_RADIUS),
                     CONF_STOPS: stops,
+                    CONF_STOPS_DISPLAY: ", ".join(map(str, stops)),
+                    CONF_REFRESH_EVERY: user_input.get(CONF_REFRESH_EVERY, DEFAULT_REFRESH_EVERY),
                 }
 
                 # Add custom coordinates if provided
@@ -194,11 +216,14 @@ class EMTMadridOptionsFlow(OptionsFlow):
                 return self.async_create_entry(title="", data={})
 
         # Get current values for defaults
-        current_radius = self.config_entry.data.get(CONF_RADIUS, 300)
+        current_radius = self.config_entry.data.get(CONF_RADIUS, DEFAULT_RADIUS)
         current_lat = self.config_entry.data.get(CONF_LATITUDE)
         current_lon = self.config_entry.data.get(CONF_LONGITUDE)
-        current_stops = self.config_entry.data.get(CONF_STOPS, [])
-        stops_str = ", ".join(str(s) for s in current_stops) if current_stops else ""
+        current_refresh = self.config_entry.data.get(CONF_REFRESH_EVERY, DEFAULT_REFRESH_EVERY)
+        stops_str = self.config_entry.data.get(CONF_STOPS_DISPLAY)
+        if stops_str is None:
+            # Entries created before the display was stored, e.g. imported from YAML
+            stops_str = ", ".join(map(str, self.config_entry.data.get(CONF_STOPS, [])))
 
         options_schema = vol.Schema(
             {
@@ -208,6 +233,9 @@ class EMTMadridOptionsFlow(OptionsFlow):
                 vol.Optional(CONF_LATITUDE, default=current_lat): vol.Any(None, vol.Coerce(float)),
                 vol.Optional(CONF_LONGITUDE, default=current_lon): vol.Any(None, vol.Coerce(float)),
                 vol.Optional(CONF_STOPS, default=stops_str): str,
+                vol.Optional(CONF_REFRESH_EVERY, default=current_refresh): vol.All(
+                    vol.Coerce(int), vol.Range(min=1, max=10)
+                ),
             }
         )
 
@@ -224,3 +252,7 @@ class InvalidAuth(HomeAssistantError):
 
 class NoHomeZone(HomeAssistantError):
     """Error to indicate zone.home is not configured."""
+
+
+class InvalidStops(HomeAssistantError):
+    """Error to indicate the stop IDs could not be parsed."""
@@ -0,0 +1,17 @@
+"""Constants for the EMT Madrid integration."""
+
+DOMAIN = "emt_madrid"
+
+CONF_STOP_ID = "stop_id"
+CONF_STOPS = "stops"
+# Stops pre-formatted for the options form, stored alongside CONF_STOPS
+CONF_STOPS_DISPLAY = "_stops_display"
+
+CONF_REFRESH_EVERY = "refresh_every"
+
+DEFAULT_RADIUS = 300
+# Minutes between full fetches, the cached estimates are aged in between
+DEFAULT_REFRESH_EVERY = 1
+
+# Arrivals polled around the configured location, enough for any service call
+NEARBY_MAX_RESULTS = 20
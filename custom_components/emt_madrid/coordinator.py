@@ -0,0 +1,197 @@
+"""Data update coordinator for the EMT Madrid integration."""
+
+from __future__ import annotations
+
+import asyncio
+from datetime import timedelta
+import heapq
+import logging
+from time import monotonic
+from typing import Any
+
+from homeassistant.const import CONF_LATITUDE, CONF_LONGITUDE, CONF_RADIUS
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+
+from .const import (
+    CONF_REFRESH_EVERY,
+    CONF_STOPS,
+    DEFAULT_RADIUS,
+    DEFAULT_REFRESH_EVERY,
+    DOMAIN,
+    NEARBY_MAX_RESULTS,
+)
+from .emt_madrid import (
+    APIEMT,
+    MAX_ARRIVAL_MINUTES,
+    MAX_CONCURRENT_REQUESTS,
+    Arrival,
+    EMTAuthError,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+UPDATE_INTERVAL = timedelta(minutes=1)
+# Every request already waits on the client's MAX_CONCURRENT_REQUESTS slots, keep the
+# extra stops to half of them so the nearby lookup fetched alongside is not queued behind
+MAX_CONCURRENT_STOPS = MAX_CONCURRENT_REQUESTS // 2
+# Arrivals the sensor exposes, the rest are dropped after ranking
+MAX_ARRIVALS = 10
+# Scheduled polls may fire slightly early, do not mistake them for manual refreshes
+SCHEDULE_JITTER = 5
+
+
+def _age_arrivals(arrivals: list[Arrival], minutes: int) -> list[Arrival]:
+    """Count down estimates fetched some minutes ago, dropping buses already gone.
+
+    Capped estimates only say the bus is far away, so they are kept as they are.
+    """
+    return [
+        arrival
+        if arrival.minutes >= MAX_ARRIVAL_MINUTES
+        else arrival._replace(minutes=arrival.minutes - minutes)
+        for arrival in arrivals
+        if arrival.minutes >= minutes
+    ]
+
+
+class EMTMadridCoordinator(DataUpdateCoordinator[dict[str, Any]]):
+    """Poll the arrivals around the configured location once per interval."""
+
+    def __init__(self, hass: HomeAssistant, api: APIEMT, config: dict[str, Any]) -> None:
+        """Initialize the coordinator."""
+        super().__init__(hass, _LOGGER, name=DOMAIN, update_interval=UPDATE_INTERVAL)
+        self.api = api
+        self.radius: int = config.get(CONF_RADIUS, DEFAULT_RADIUS)
+        self.extra_stops: list[int] = config.get(CONF_STOPS, [])
+        # Custom coordinates never change, only zone.home needs a lookup per update
+        self._fixed_coords: tuple[float, float] | None = None
+        if config.get(CONF_LATITUDE) is not None and config.get(CONF_LONGITUDE) is not None:
+            self._fixed_coords = (config[CONF_LATITUDE], config[CONF_LONGITUDE])
+        self.refresh_every: int = config.get(CONF_REFRESH_EVERY, DEFAULT_REFRESH_EVERY)
+        self._fetched: dict[str, Any] | None = None
+        self._fetched_at = 0.0
+        # Bound the extra stops fetched at once, below the per-client request cap
+        self._stop_semaphore = asyncio.Semaphore(MAX_CONCURRENT_STOPS)
+
+    def _get_coordinates(self) -> tuple[float | None, float | None]:
+        """Get coordinates from zone.home."""
+        zone_home = self.hass.states.get("zone.home")
+        if zone_home:
+            return (
+                zone_home.attributes.get("latitude"),
+                zone_home.attributes.get("longitude"),
+            )
+
+        return None, None
+
+    async def _async_fetch_all(
+        self, latitude: float, longitude: float
+    ) -> tuple[tuple[list[Arrival], int], list]:
+        """Fetch the nearby stops and the extra stops, which are independent requests.
+
+        Raises EMTAuthError if any request was rejected, other extra-stop
+        failures are returned in place of their arrivals.
+        """
+        nearby, extra_results = await asyncio.gather(
+            self.api.async_get_nearby_arrivals(
+                longitude, latitude, self.radius, NEARBY_MAX_RESULTS
+            ),
+            asyncio.gather(
+                *(self._async_fetch_stop(stop_id) for stop_id in self.extra_stops),
+                return_exceptions=True,
+            ),
+        )
+        for result in extra_results:
+            if isinstance(result, EMTAuthError):
+                raise result
+        return nearby, extra_results
+
+    async def _async_fetch_stop(self, stop_id: int) -> list[Arrival]:
+        """Fetch the arrivals of one of the extra stops."""
+        async with self._stop_semaphore:
+            stop_info = await self.api.async_fetch_stop_snapshot(stop_id)
+
+        stop_name = stop_info.get("bus_stop_name")
+        arrivals: list[Arrival] = []
+
+        for line, line_info in stop_info.get("lines", {}).items():
+            destination = line_info.get("destination")
+            distances = line_info.get("distance", [])
+            arrivals.extend(
+                Arrival(
+                    stop_name,
+                    stop_id,
+                    None,
+                    line,
+                    destination,
+                    arrival_time,
+                    distances[i] if i < len(distances) else None,
+                )
+                for i, arrival_time in enumerate(line_info.get("arrivals", []))
+            )
+
+        return arrivals
+
+    async def _async_update_data(self) -> dict[str, Any]:
+        """Fetch the nearby arrivals and the arrivals of the extra stops."""
+        latitude, longitude = self._fixed_coords or self._get_coordinates()
+
+        if latitude is None or longitude is None:
+            raise UpdateFailed("No coordinates available")
+
+        # Between full fetches, count the last estimates down instead of calling the API
+        fetched = self._fetched
+        elapsed = monotonic() - self._fetched_at
+        if (
+            fetched is not None
+            and (fetched["latitude"], fetched["longitude"]) == (latitude, longitude)
+            and elapsed + SCHEDULE_JITTER < self.refresh_every * UPDATE_INTERVAL.total_seconds()
+        ):
+            # Scheduled polls land slightly under a minute apart, count them as whole minutes
+            minutes = int((elapsed + SCHEDULE_JITTER) // 60)
+            return {
+                **fetched,
+                "nearby": _age_arrivals(fetched["nearby"], minutes),
+                "arrivals": _age_arrivals(fetched["arrivals"], minutes),
+            }
+
+        fetched_at = monotonic()
+
+        try:
+            token = await self.api.async_ensure_token()
+            try:
+                (nearby, stops_count), extra_results = await self._async_fetch_all(
+                    latitude, longitude
+                )
+            except EMTAuthError:
+                # The token was rejected, log in again once for the whole poll
+                await self.api.async_ensure_token(rejected_token=token)
+                (nearby, stops_count), extra_results = await self._async_fetch_all(
+                    latitude, longitude
+                )
+        except EMTAuthError as err:
+            raise UpdateFailed(f"Authentication with EMT Madrid failed: {err}") from err
+
+        arrivals = list(nearby)
+        for stop_id, result in zip(self.extra_stops, extra_results):
+            if isinstance(result, Exception):
+                _LOGGER.warning(f"Error getting arrivals for stop {stop_id}: {result}")
+                continue
+            arrivals.extend(result)
+            if result:
+                stops_count += 1
+
+        # Keep only the soonest arrivals, without sorting the whole list
+        arrivals = heapq.nsmallest(MAX_ARRIVALS, arrivals, key=lambda x: x.minutes)
+
+        self._fetched = {
+            "latitude": latitude,
+            "longitude": longitude,
+            "radius": self.radius,
+            "nearby": nearby,
+            "arrivals": arrivals,
+            "stops_count": stops_count,
+        }
+        self._fetched_at = fetched_at
+        return self._fetched
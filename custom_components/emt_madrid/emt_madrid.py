@@ -1,10 +1,16 @@
 """Support for EMT Madrid API."""
 
-import json
+import asyncio
+import copy
 import logging
 import math
+from time import monotonic
+from typing import NamedTuple
 
-import requests
+import aiohttp
+
+from homeassistant.helpers.json import json_dumps
+from homeassistant.util.json import json_loads
 
 BASE_URL = "https://openapi.emtmadrid.es/"
 ENDPOINT_LOGIN = "v1/mobilitylabs/user/login/"
@@ -13,10 +19,62 @@ ENDPOINT_STOP_INFO = "v1/transport/busemtmad/stops/"
 ENDPOINT_STOPS_ARROUND_STOP = "v2/transport/busemtmad/stops/arroundstop/"
 ENDPOINT_STOPS_FROM_XY = "v1/transport/busemtmad/stops/arroundxy/"
 
+# Number of lookups kept in memory per client and cache
+CACHE_SIZE = 32
+# Stop geometry is static, while arrival estimates go stale quickly
+NEARBY_STOPS_TTL = 86400
+NEARBY_ARRIVALS_TTL = 15
+STOP_INFO_TTL = 3600
+# EMT tokens are valid for ~2h, refresh conservatively
+TOKEN_TTL = 3600
+# Requests a client sends to the EMT API at the same time
+MAX_CONCURRENT_REQUESTS = 4
+# The API reports far away buses as 45 minutes or more
+MAX_ARRIVAL_MINUTES = 45
+
 
 _LOGGER = logging.getLogger(__name__)
 
 
+class EMTAuthError(Exception):
+    """Raised when the EMT API rejects the credentials or the access token."""
+
+
+class Arrival(NamedTuple):
+    """A bus arriving at a stop, converted to a dict where Home Assistant needs one."""
+
+    stop_name: str | None
+    stop_id: int | str | None
+    stop_distance: int | None
+    line: str | None
+    destination: str | None
+    minutes: int
+    bus_distance: int | None
+
+
+def _location_key(longitude: float, latitude: float, radius: int) -> tuple:
+    """Build a cache key, rounding coordinates to ~11m so nearby lookups coalesce."""
+    return (round(longitude, 4), round(latitude, 4), radius)
+
+
+def _cache_get(cache: dict, key: tuple, ttl: int):
+    """Return a cached value if it is younger than ttl seconds."""
+    entry = cache.get(key)
+    if entry is None or monotonic() - entry[0] >= ttl:
+        return None
+    # Move the entry to the end, so eviction drops the least recently used one
+    cache[key] = cache.pop(key)
+    return entry[1]
+
+
+def _cache_put(cache: dict, key: tuple, value) -> None:
+    """Store a value in a cache, evicting the least recently used entry when full."""
+    cache.pop(key, None)
+    if len(cache) >= CACHE_SIZE:
+        cache.pop(next(iter(cache)), None)
+    cache[key] = (monotonic(), value)
+
+
 class APIEMT:
     """A class representing an API client for EMT (Empresa Municipal de Transportes) services.
 
@@ -24,11 +82,23 @@ class APIEMT:
     update arrival times, and access the retrieved data.
     """
 
-    def __init__(self, user, password, stop_id) -> None:
-        """Initialize an instance of the APIEMT class."""
+    def __init__(self, user, password, stop_id, session: aiohttp.ClientSession) -> None:
+        """Initialize an instance of the APIEMT class.
+
+        Requests are sent through the shared aiohttp ``session``, directly on
+        the event loop instead of the executor.
+        """
         self._user = user
         self._password = password
+        self._session = session
+        self._request_semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
         self._token = None
+        self._token_expires_at = 0.0
+        # Serialize re-authentication so concurrent callers share a single login
+        self._auth_lock = asyncio.Lock()
+        self._nearby_stops_cache: dict[tuple, tuple[float, list]] = {}
+        self._nearby_arrivals_cache: dict[tuple, tuple[float, tuple[list, int]]] = {}
+        self._stop_info_cache: dict[tuple, tuple[float, dict]] = {}
         self._stop_info = {
             "bus_stop_id": stop_id,
             "bus_stop_name": None,
@@ -37,40 +107,100 @@ class APIEMT:
             "lines": {},
         }
 
-    def authenticate(self):
+    async def async_authenticate(self):
         """Authenticate the user using the provided credentials."""
         headers = {"email": self._user, "password": self._password}
         url = f"{BASE_URL}{ENDPOINT_LOGIN}"
-        response = self._make_request(url, headers=headers, method="GET")
+        response = await self._async_make_request(url, headers=headers, method="GET")
         self._token = self._extract_token(response)
+        self._token_expires_at = monotonic() + TOKEN_TTL
+
+    @property
+    def token_valid(self) -> bool:
+        """Return whether the client holds a token that has not expired yet."""
+        return self._token is not None and monotonic() < self._token_expires_at
+
+    async def async_ensure_token(self, rejected_token=None):
+        """Log in again if the token expired, or if it is the ``rejected_token``.
+
+        A rejected token that a concurrent call already replaced does not
+        trigger another login. Returns the token in use, to pass back as the
+        ``rejected_token`` if a request fails with it. Raises EMTAuthError on
+        invalid credentials.
+        """
+        async with self._auth_lock:
+            if not self.token_valid or (
+                rejected_token is not None and self._token == rejected_token
+            ):
+                await self.async_authenticate()
+            return self._token
 
     def _extract_token(self, response):
         """Extract the access token from the API response."""
         try:
             if response.get("code") != "01":
-                _LOGGER.error("Invalid email or password")
-                return "Invalid token"
+                raise EMTAuthError("Invalid email or password")
             return response["data"][0]["accessToken"]
         except (KeyError, IndexError) as e:
             raise ValueError("Unable to get token from the API") from e
 
-    def update_stop_info(self, stop_id):
+    async def async_update_stop_info(self, stop_id):
         """Update all the lines and information from the bus stop."""
+        details = await self._async_get_stop_details(stop_id)
+        if details is not None:
+            self._stop_info.update(details)
+
+    async def _async_get_stop_details(self, stop_id):
+        """Get a private copy of the name, address and lines of a bus stop."""
+        # The stop name and its lines barely change, only the arrivals need polling
+        cached = _cache_get(self._stop_info_cache, (stop_id,), STOP_INFO_TTL)
+        if cached is not None:
+            return copy.deepcopy(cached)
         url = f"{BASE_URL}{ENDPOINT_STOP_INFO}{stop_id}/detail/"
         headers = {"accessToken": self._token}
         data = {"idStop": stop_id}
-        if self._token != "Invalid token":
-            response = self._make_request(url, headers=headers, data=data, method="GET")
-            self._parse_stop_info(response)
-
-    def retry_update_stop_info(self):
+        if self._token is None:
+            return None
+        response = await self._async_make_request(url, headers=headers, data=data, method="GET")
+        retry_response = None
+        if response.get("code") == "81":
+            retry_response = await self.async_retry_update_stop_info(stop_id)
+        details = self._parse_stop_info(response, retry_response)
+        if details is not None:
+            _cache_put(self._stop_info_cache, (stop_id,), copy.deepcopy(details))
+        return details
+
+    async def async_fetch_stop_snapshot(self, stop_id):
+        """Fetch the information and arrival times of a bus stop.
+
+        Unlike ``async_update_stop_info`` and ``async_update_arrival_times``,
+        the result is a new dict, so several stops can be fetched at the same time.
+        """
+        snapshot = {
+            "bus_stop_id": stop_id,
+            "bus_stop_name": None,
+            "bus_stop_coordinates": None,
+            "bus_stop_address": None,
+            "lines": {},
+        }
+        details = await self._async_get_stop_details(stop_id)
+        if details is not None:
+            snapshot.update(details)
+        if self._token is not None:
+            url, headers, data = self._stop_arrivals_request(stop_id)
+            response = await self._async_make_request(url, headers=headers, data=data, method="POST")
+            self._parse_arrivals(response, snapshot["lines"])
+        return snapshot
+
+    async def async_retry_update_stop_info(self, stop_id=None):
         """Update all the lines and information from the bus stop."""
-        stop_id = self._stop_info["bus_stop_id"]
+        if stop_id is None:
+            stop_id = self._stop_info["bus_stop_id"]
         url = f"{BASE_URL}{ENDPOINT_STOPS_ARROUND_STOP}{stop_id}/0/"
         headers = {"accessToken": self._token}
         data = {"idStop": stop_id}
-        if self._token != "Invalid token":
-            response = self._make_request(url, headers=headers, data=data, method="GET")
+        if self._token is not None:
+            response = await self._async_make_request(url, headers=headers, data=data, method="GET")
             return response
 
     def get_stop_info(
@@ -79,40 +209,42 @@ class APIEMT:
         """Retrieve all the information from the bus stop."""
         return self._stop_info
 
-    def _parse_stop_info(self, response):
-        """Parse the stop info from the API response."""
+    def _parse_stop_info(self, response, retry_response=None):
+        """Parse the stop info from the API response.
+
+        ``retry_response`` holds the stops-around answer requested when the
+        detail endpoint replies with code 81. Return the parsed details, or
+        None when the API reported an error.
+        """
         try:
             response_code = response.get("code")
             if response_code == "90":
                 _LOGGER.warning("Bus stop disabled or does not exist")
-            elif response_code == "80":
-                _LOGGER.warning("Invalid token")
-            elif response_code == "98":
+                return None
+            if response_code == "80":
+                raise EMTAuthError("Invalid token when fetching the stop details")
+            if response_code == "98":
                 _LOGGER.warning("API limit reached")
-            elif response_code == "81":
-                response = self.retry_update_stop_info()
-
-                stop_info = response["data"][0]
-                self._stop_info.update(
-                    {
-                        "bus_stop_name": stop_info["stopName"],
-                        "bus_stop_coordinates": stop_info["geometry"]["coordinates"],
-                        "bus_stop_address": stop_info["address"],
-                        "lines": self._parse_lines(stop_info["lines"], "basic"),
-                    }
-                )
+                return None
+            if response_code == "81":
+                stop_info = retry_response["data"][0]
+                details = {
+                    "bus_stop_name": stop_info["stopName"],
+                    "bus_stop_coordinates": stop_info["geometry"]["coordinates"],
+                    "bus_stop_address": stop_info["address"],
+                    "lines": self._parse_lines(stop_info["lines"], "basic"),
+                }
             else:
                 stop_info = response["data"][0]["stops"][0]
-                self._stop_info.update(
-                    {
-                        "bus_stop_name": stop_info["name"],
-                        "bus_stop_coordinates": stop_info["geometry"]["coordinates"],
-                        "bus_stop_address": stop_info["postalAddress"],
-                        "lines": self._parse_lines(stop_info["dataLine"], "full"),
-                    }
-                )
+                details = {
+                    "bus_stop_name": stop_info["name"],
+                    "bus_stop_coordinates": stop_info["geometry"]["coordinates"],
+                    "bus_stop_address": stop_info["postalAddress"],
+                    "lines": self._parse_lines(stop_info["dataLine"], "full"),
+                }
         except (KeyError, IndexError) as e:
             raise ValueError("Unable to get bus stop information") from e
+        return details
 
     def _parse_lines(self, lines, mode):
         """Parse the line info from the API response."""
@@ -149,13 +281,11 @@ class APIEMT:
                 }
         return line_info
 
-    def update_arrival_times(self, stop):
+    async def async_update_arrival_times(self, stop):
         """Update the arrival times for the specified bus stop and line."""
-        url = f"{BASE_URL}{ENDPOINT_ARRIVAL_TIME}{stop}/arrives/"
-        headers = {"accessToken": self._token}
-        data = {"stopId": stop, "Text_EstimationsRequired_YN": "Y"}
-        if self._token != "Invalid token":
-            response = self._make_request(
+        url, headers, data = self._stop_arrivals_request(stop)
+        if self._token is not None:
+            response = await self._async_make_request(
                 url, headers=headers, data=data, method="POST"
             )
             self._parse_arrivals(response)
@@ -166,9 +296,8 @@ class APIEMT:
             arrivals = self._stop_info["lines"][line].get("arrivals")
         except KeyError:
             return [None, None]
-        while len(arrivals) < 2:
-            arrivals.append(None)
-        return arrivals
+        # Pad a copy, the stored arrivals only ever hold minutes
+        return arrivals + [None] * (2 - len(arrivals))
 
     def get_line_info(self, line):
         """Retrieve the information for a specific line."""
@@ -193,22 +322,28 @@ class APIEMT:
         }
         return line_info
 
-    def _parse_arrivals(self, response):
-        """Parse the arrival times and distance from the API response."""
+    def _parse_arrivals(self, response, lines=None):
+        """Parse the arrival times and distance from the API response.
+
+        The times are stored in ``lines``, the lines of the tracked stop by default.
+        """
+        if lines is None:
+            lines = self._stop_info["lines"]
         try:
             if response.get("code") == "80":
-                _LOGGER.warning("Bus Stop disabled or does not exist")
+                raise EMTAuthError("Invalid token when fetching arrivals")
             else:
-                for line_info in self._stop_info["lines"].values():
+                for line_info in lines.values():
                     line_info["arrivals"] = []
                     line_info["distance"] = []
                 arrivals = response["data"][0].get("Arrive", [])
                 for arrival in arrivals:
                     line = arrival.get("line")
-                    line_info = self._stop_info["lines"].get(line)
-                    arrival_time = min(
-                        math.trunc(arrival.get("estimateArrive") / 60), 45
-                    )
+                    line_info = lines.get(line)
+                    estimate = arrival.get("estimateArrive")
+                    if estimate is None:
+                        continue
+                    arrival_time = min(math.trunc(estimate / 60), MAX_ARRIVAL_MINUTES)
                     if line_info:
                         line_info["arrivals"].append(arrival_time)
                         line_info["distance"].append(arrival.get("DistanceBus"))
@@ -217,7 +352,7 @@ class APIEMT:
         except TypeError as e:
             _LOGGER.error(f"ERROR {e} --> RESPONSE: {response}")
 
-    def get_stops_from_coordinates(self, longitude: float, latitude: float, radius: int = 300) -> list:
+    async def async_get_stops_from_coordinates(self, longitude: float, latitude: float, radius: int = 300) -> list:
         """Get bus stops within a radius of given coordinates.
 
         Args:
@@ -228,16 +363,26 @@ class APIEMT:
         Returns:
             List of stop dictionaries with stop info and lines
         """
-        if self._token == "Invalid token":
+        if self._token is None:
             return []
 
+        key = _location_key(longitude, latitude, radius)
+        stops = _cache_get(self._nearby_stops_cache, key, NEARBY_STOPS_TTL)
+        if stops is not None:
+            return stops
+
         url = f"{BASE_URL}{ENDPOINT_STOPS_FROM_XY}{longitude}/{latitude}/{radius}/"
         headers = {"accessToken": self._token}
 
         try:
-            response = self._make_request(url, headers=headers, method="GET")
+            response = await self._async_make_request(url, headers=headers, method="GET")
             _LOGGER.debug(f"Nearby stops API response: {response}")
-            return self._parse_nearby_stops(response)
+            stops = self._parse_nearby_stops(response)
+            if stops:
+                _cache_put(self._nearby_stops_cache, key, stops)
+            return stops
+        except EMTAuthError:
+            raise
         except Exception as e:
             _LOGGER.error(f"Error getting stops from coordinates: {e}")
             return []
@@ -280,14 +425,16 @@ class APIEMT:
                         "lines": lines
                     })
             elif response_code == "80":
-                _LOGGER.warning("Invalid token when fetching nearby stops")
+                raise EMTAuthError("Invalid token when fetching nearby stops")
             elif response_code == "90":
                 _LOGGER.debug("No stops found near coordinates")
         except (KeyError, TypeError) as e:
             _LOGGER.error(f"Error parsing nearby stops: {e}")
         return stops
 
-    def get_nearby_arrivals(self, longitude: float, latitude: float, radius: int = 300, max_results: int = 10) -> list:
+    async def async_get_nearby_arrivals(
+        self, longitude: float, latitude: float, radius: int = 300, max_results: int = 10
+    ) -> tuple[list[Arrival], int]:
         """Get all bus arrivals for stops near given coordinates.
 
         Args:
@@ -297,51 +444,84 @@ class APIEMT:
             max_results: Maximum number of arrivals to return
 
         Returns:
-            List of arrivals sorted by arrival time
+            List of arrivals sorted by arrival time, and the number of stops
+            that reported at least one arrival
         """
-        stops = self.get_stops_from_coordinates(longitude, latitude, radius)
-        all_arrivals = []
-
-        for stop in stops:
-            stop_id = stop["stop_id"]
-            url = f"{BASE_URL}{ENDPOINT_ARRIVAL_TIME}{stop_id}/arrives/"
-            headers = {"accessToken": self._token}
-            data = {"stopId": stop_id, "Text_EstimationsRequired_YN": "Y"}
-
-            try:
-                response = self._make_request(url, headers=headers, data=data, method="POST")
-                arrivals = response.get("data", [{}])[0].get("Arrive", [])
-
-                for arrival in arrivals:
-                    estimate = arrival.get("estimateArrive")
-                    if estimate is None:
-                        continue
-                    arrival_minutes = min(math.trunc(estimate / 60), 45)
-                    all_arrivals.append({
-                        "stop_name": stop["stop_name"],
-                        "stop_id": stop_id,
-                        "stop_distance": stop["distance"],
-                        "line": arrival.get("line"),
-                        "destination": arrival.get("destination"),
-                        "minutes": arrival_minutes,
-                        "bus_distance": arrival.get("DistanceBus")
-                    })
-            except Exception as e:
-                _LOGGER.warning(f"Error getting arrivals for stop {stop_id}: {e}")
-
-        all_arrivals.sort(key=lambda x: x["minutes"])
-        return all_arrivals[:max_results]
+        key = (*_location_key(longitude, latitude, radius), max_results)
+        cached = _cache_get(self._nearby_arrivals_cache, key, NEARBY_ARRIVALS_TTL)
+        if cached is not None:
+            arrivals, stops_count = cached
+            # Callers may extend the list, keep the cached one intact
+            return list(arrivals), stops_count
+
+        stops = await self.async_get_stops_from_coordinates(longitude, latitude, radius)
+
+        # EMT has no batch arrivals endpoint, so query every stop concurrently
+        results = await asyncio.gather(
+            *(self._async_get_stop_arrivals(stop) for stop in stops)
+        )
+        all_arrivals = [arrival for stop_arrivals in results for arrival in stop_arrivals]
+        stops_count = sum(1 for stop_arrivals in results if stop_arrivals)
+
+        all_arrivals.sort(key=lambda x: x.minutes)
+        all_arrivals = all_arrivals[:max_results]
+        _cache_put(self._nearby_arrivals_cache, key, (list(all_arrivals), stops_count))
+        return all_arrivals, stops_count
+
+    async def _async_get_stop_arrivals(self, stop: dict) -> list:
+        """Get the arrivals of a single nearby stop."""
+        url, headers, data = self._stop_arrivals_request(stop["stop_id"])
+        try:
+            response = await self._async_make_request(url, headers=headers, data=data, method="POST")
+            return self._parse_stop_arrivals(stop, response)
+        except EMTAuthError:
+            raise
+        except Exception as e:
+            _LOGGER.warning(f"Error getting arrivals for stop {stop['stop_id']}: {e}")
+            return []
 
-    def _make_request(self, url: str, headers=None, data=None, method="POST"):
-        """Send an HTTP request to the specified URL."""
+    def _stop_arrivals_request(self, stop_id):
+        """Build the url, headers and payload to query the arrivals of a stop."""
+        url = f"{BASE_URL}{ENDPOINT_ARRIVAL_TIME}{stop_id}/arrives/"
+        headers = {"accessToken": self._token}
+        data = {"stopId": stop_id, "Text_EstimationsRequired_YN": "Y"}
+        return url, headers, data
+
+    def _parse_stop_arrivals(self, stop: dict, response: dict) -> list[Arrival]:
+        """Parse the arrivals of a nearby stop from the API response."""
+        if response.get("code") == "80":
+            raise EMTAuthError("Invalid token when fetching arrivals")
+        stop_arrivals = []
+        arrivals = response.get("data", [{}])[0].get("Arrive", [])
+
+        for arrival in arrivals:
+            estimate = arrival.get("estimateArrive")
+            if estimate is None:
+                continue
+            arrival_minutes = min(math.trunc(estimate / 60), MAX_ARRIVAL_MINUTES)
+            stop_arrivals.append(Arrival(
+                stop_name=stop["stop_name"],
+                stop_id=stop["stop_id"],
+                stop_distance=stop["distance"],
+                line=arrival.get("line"),
+                destination=arrival.get("destination"),
+                minutes=arrival_minutes,
+                bus_distance=arrival.get("DistanceBus"),
+            ))
+        return stop_arrivals
+
+    async def _async_make_request(self, url: str, headers=None, data=None, method="POST"):
+        """Send an HTTP request to the specified URL using the shared aiohttp session."""
         try:
             if method not in ["POST", "GET"]:
                 raise ValueError(f"Invalid HTTP method: {method}")
-            kwargs = {"url": url, "headers": headers, "timeout": 10}
+            kwargs = {"headers": headers, "timeout": aiohttp.ClientTimeout(total=10)}
             if method == "POST":
-                kwargs["data"] = json.dumps(data)
-            response = requests.request(method, **kwargs)
-            response.raise_for_status()
-            return response.json()
-        except requests.HTTPError as e:
-            raise requests.HTTPError(f"Error while connecting to EMT API: {e}") from e
+                kwargs["data"] = json_dumps(data)
+            async with self._request_semaphore, self._session.request(
+                method, url, **kwargs
+            ) as response:
+                response.raise_for_status()
+                return await response.json(loads=json_loads, content_type=None)
+        except aiohttp.ClientResponseError as e:
+            raise aiohttp.ClientError(f"Error while connecting to EMT API: {e}") from e
@@ -2,25 +2,22 @@
 
 from __future__ import annotations
 
-from datetime import timedelta
 import logging
 from typing import Any
 
 from homeassistant.components.sensor import SensorEntity
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import CONF_LATITUDE, CONF_LONGITUDE, CONF_RADIUS
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
-from .emt_madrid import APIEMT
+from .const import DOMAIN
+from .coordinator import EMTMadridCoordinator
+from .emt_madrid import Arrival
+from .speech import NO_ARRIVALS_SPEECH, join_phrases, speech_phrase
 
 _LOGGER = logging.getLogger(__name__)
 
-DOMAIN = "emt_madrid"
-CONF_STOPS = "stops"
-
-SCAN_INTERVAL = timedelta(minutes=1)
-
 ATTR_ARRIVALS = "arrivals"
 ATTR_STOPS_COUNT = "stops_count"
 ATTR_SPEECH = "speech"
@@ -37,32 +34,20 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up EMT Madrid sensor from a config entry."""
-    data = hass.data[DOMAIN][entry.entry_id]
-    api: APIEMT = data["api"]
-    config = data["config"]
-
-    radius = config.get(CONF_RADIUS, 300)
-    extra_stops = config.get(CONF_STOPS, [])
-    custom_lat = config.get(CONF_LATITUDE)
-    custom_lon = config.get(CONF_LONGITUDE)
+    coordinator: EMTMadridCoordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
 
     # Create the main nearby arrivals sensor
     sensors = [
         EMTNearbyArrivalsSensor(
-            hass=hass,
-            api=api,
-            radius=radius,
-            extra_stops=extra_stops,
-            custom_latitude=custom_lat,
-            custom_longitude=custom_lon,
+            coordinator=coordinator,
             entry_id=entry.entry_id,
         )
     ]
 
-    async_add_entities(sensors, True)
+    async_add_entities(sensors)
 
 
-class EMTNearbyArrivalsSensor(SensorEntity):
+class EMTNearbyArrivalsSensor(CoordinatorEntity[EMTMadridCoordinator], SensorEntity):
     """Sensor showing next bus arrivals near configured location."""
 
     _attr_attribution = ATTRIBUTION
@@ -71,46 +56,42 @@ class EMTNearbyArrivalsSensor(SensorEntity):
 
     def __init__(
         self,
-        hass: HomeAssistant,
-        api: APIEMT,
-        radius: int,
-        extra_stops: list[int],
-        custom_latitude: float | None,
-        custom_longitude: float | None,
+        coordinator: EMTMadridCoordinator,
         entry_id: str,
     ) -> None:
         """Initialize the sensor."""
-        self._hass = hass
-        self._api = api
-        self._radius = radius
-        self._extra_stops = extra_stops
-        self._custom_latitude = custom_latitude
-        self._custom_longitude = custom_longitude
+        super().__init__(coordinator)
+        self._radius = coordinator.radius
+        self._extra_stops = coordinator.extra_stops
         self._attr_unique_id = f"emt_madrid_nearby_{entry_id}"
         self._attr_name = "EMT Nearby Buses"
-        self._arrivals: list[dict] = []
+        self._arrivals: list[Arrival] = []
         self._stops_count = 0
+        self._arrivals_top10: tuple[dict, ...] = ()
+        self._speech = self._format_speech()
         self._current_lat: float | None = None
         self._current_lon: float | None = None
+        self._update_from_coordinator()
+        self._last_signature = self._data_signature()
 
     @property
     def native_value(self) -> str | None:
         """Return the state - next bus info."""
         if self._arrivals:
             next_bus = self._arrivals[0]
-            stop_name = next_bus.get('stop_name', '')
+            stop_name = next_bus.stop_name
             if stop_name:
-                return f"{next_bus['line']} en {next_bus['minutes']} min → {stop_name}"
-            return f"{next_bus['line']} en {next_bus['minutes']} min"
+                return f"{next_bus.line} en {next_bus.minutes} min → {stop_name}"
+            return f"{next_bus.line} en {next_bus.minutes} min"
         return "Sin buses"
 
     @property
     def extra_state_attributes(self) -> dict[str, Any]:
         """Return the device state attributes."""
         return {
-            ATTR_ARRIVALS: self._arrivals[:10],
+            ATTR_ARRIVALS: self._arrivals_top10,
             ATTR_STOPS_COUNT: self._stops_count,
-            ATTR_SPEECH: self._format_speech(),
+            ATTR_SPEECH: self._speech,
             ATTR_RADIUS: self._radius,
             ATTR_EXTRA_STOPS: self._extra_stops,
             ATTR_LATITUDE: self._current_lat,
@@ -120,105 +101,58 @@ class EMTNearbyArrivalsSensor(SensorEntity):
     def _format_speech(self) -> str:
         """Format arrivals for voice response."""
         if not self._arrivals:
-            return "No hay autobuses llegando a paradas cercanas en este momento."
+            return NO_ARRIVALS_SPEECH
 
         lines_mentioned = set()
         speech_parts = []
 
-        for arrival in self._arrivals[:5]:
-            line = arrival["line"]
-            minutes = arrival["minutes"]
-            stop_name = arrival.get("stop_name", "")
-
-            if line not in lines_mentioned:
-                if minutes == 0:
-                    if stop_name:
-                        speech_parts.append(f"Línea {line} llegando ahora en {stop_name}")
-                    else:
-                        speech_parts.append(f"Línea {line} llegando ahora")
-                elif minutes == 1:
-                    if stop_name:
-                        speech_parts.append(f"Línea {line} en 1 minuto en {stop_name}")
-                    else:
-                        speech_parts.append(f"Línea {line} en 1 minuto")
-                else:
-                    if stop_name:
-                        speech_parts.append(f"Línea {line} en {minutes} minutos en {stop_name}")
-                    else:
-                        speech_parts.append(f"Línea {line} en {minutes} minutos")
-                lines_mentioned.add(line)
-
-        if len(speech_parts) == 1:
-            return speech_parts[0] + "."
-        elif len(speech_parts) == 2:
-            return f"{speech_parts[0]} y {speech_parts[1]}."
-        else:
-            return ", ".join(speech_parts[:-1]) + f", y {speech_parts[-1]}."
-
-    def _get_coordinates(self) -> tuple[float | None, float | None]:
-        """Get coordinates from custom config or zone.home."""
-        if self._custom_latitude is not None and self._custom_longitude is not None:
-            return self._custom_latitude, self._custom_longitude
-
-        zone_home = self._hass.states.get("zone.home")
-        if zone_home:
-            return (
-                zone_home.attributes.get("latitude"),
-                zone_home.attributes.get("longitude"),
-            )
-
-        return None, None
-
-    async def async_update(self) -> None:
-        """Fetch new state data for the sensor."""
-        latitude, longitude = self._get_coordinates()
-
-        if latitude is None or longitude is None:
-            _LOGGER.warning("No coordinates available")
-            return
+        # Mention the soonest arrival of up to five different lines
+        for arrival in self._arrivals:
+            if len(speech_parts) >= 5:
+                break
+
+            line = arrival.line
+            if line in lines_mentioned:
+                continue
 
-        self._current_lat = latitude
-        self._current_lon = longitude
+            speech_parts.append(speech_phrase(line, arrival.minutes, arrival.stop_name))
+            lines_mentioned.add(line)
 
-        # Get nearby arrivals
-        arrivals = await self._hass.async_add_executor_job(
-            self._api.get_nearby_arrivals,
-            longitude,
-            latitude,
-            self._radius,
-            20,
+        # Same wording as the service
+        return join_phrases(speech_parts)
+
+    def _update_from_coordinator(self) -> None:
+        """Copy the latest coordinator data into the sensor."""
+        data = self.coordinator.data
+        if not data:
+            return
+
+        self._current_lat = data["latitude"]
+        self._current_lon = data["longitude"]
+        self._arrivals = data["arrivals"]
+        self._stops_count = data["stops_count"]
+        # Attributes are read on every state write, build them once here
+        self._arrivals_top10 = tuple(arrival._asdict() for arrival in self._arrivals[:10])
+        self._speech = self._format_speech()
+
+    def _data_signature(self) -> tuple:
+        """Summarize everything the state and attributes are built from."""
+        data = self.coordinator.data or {}
+        return (
+            self.available,
+            tuple(data.get("arrivals", ())[:10]),
+            data.get("stops_count"),
+            data.get("latitude"),
+            data.get("longitude"),
         )
 
-        # Also get arrivals from extra stops if configured
-        if self._extra_stops:
-            for stop_id in self._extra_stops:
-                try:
-                    await self._hass.async_add_executor_job(
-                        self._api.update_stop_info, stop_id
-                    )
-                    await self._hass.async_add_executor_job(
-                        self._api.update_arrival_times, stop_id
-                    )
-                    stop_info = self._api.get_stop_info()
-
-                    for line, line_info in stop_info.get("lines", {}).items():
-                        for i, arrival_time in enumerate(line_info.get("arrivals", [])):
-                            if arrival_time is not None:
-                                distances = line_info.get("distance", [])
-                                arrivals.append({
-                                    "stop_name": stop_info.get("bus_stop_name"),
-                                    "stop_id": stop_id,
-                                    "stop_distance": None,
-                                    "line": line,
-                                    "destination": line_info.get("destination"),
-                                    "minutes": arrival_time,
-                                    "bus_distance": distances[i] if i < len(distances) else None,
-                                })
-                except Exception as e:
-                    _LOGGER.warning(f"Error getting arrivals for stop {stop_id}: {e}")
-
-        # Sort all arrivals by time
-        arrivals.sort(key=lambda x: x["minutes"])
-
-        self._arrivals = arrivals
-        self._stops_count = len(set(a.get("stop_id") for a in arrivals if a.get("stop_id")))
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Handle updated data from the coordinator."""
+        # Polls often return the same buses, skip rebuilding and writing the same state
+        signature = self._data_signature()
+        if signature == self._last_signature:
+            return
+        self._last_signature = signature
+        self._update_from_coordinator()
+        super()._handle_coordinator_update()
@@ -0,0 +1,34 @@
+"""Spanish speech for bus arrivals, shared by the sensor and the service."""
+
+from __future__ import annotations
+
+from functools import lru_cache
+
+NO_ARRIVALS_SPEECH = "No hay autobuses llegando a paradas cercanas en este momento."
+
+# Speech templates, the stop name is appended when it is known
+SPEECH_NOW = "Línea {} llegando ahora"
+SPEECH_ONE_MINUTE = "Línea {} en 1 minuto"
+SPEECH_MINUTES = "Línea {} en {} minutos"
+SPEECH_AT_STOP = "{} en {}"
+
+
+@lru_cache(maxsize=256)
+def speech_phrase(line: str, minutes: int, stop_name: str | None) -> str:
+    """Format the speech for one arrival, cached as polls repeat the same buses."""
+    if minutes == 0:
+        phrase = SPEECH_NOW.format(line)
+    elif minutes == 1:
+        phrase = SPEECH_ONE_MINUTE.format(line)
+    else:
+        phrase = SPEECH_MINUTES.format(line, minutes)
+    if stop_name:
+        phrase = SPEECH_AT_STOP.format(phrase, stop_name)
+    return phrase
+
+
+def join_phrases(phrases: list[str]) -> str:
+    """Join arrival phrases as "A.", "A y B." or "A, B, y C."."""
+    head = ", ".join(phrases[:-1])
+    separator = ", y " if len(phrases) > 2 else " y " if head else ""
+    return f"{head}{separator}{phrases[-1]}."
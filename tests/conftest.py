@@ -44,6 +44,15 @@ def hass():
 def mock_api_request():
     """Create a mock for API requests."""
     with patch(
-        "custom_components.emt_madrid.emt_madrid.APIEMT._make_request"
+        "custom_components.emt_madrid.emt_madrid.APIEMT._async_make_request"
     ) as mock:
         yield mock
+
+
+@pytest.fixture(autouse=True)
+def mock_clientsession():
+    """Avoid creating a real aiohttp session for the mocked hass instance."""
+    with patch("custom_components.emt_madrid.async_get_clientsession"), patch(
+        "custom_components.emt_madrid.config_flow.async_get_clientsession"
+    ):
+        yield
@@ -1,6 +1,8 @@
 """Tests for the EMT Madrid integration."""
 
-from unittest.mock import patch, MagicMock
+import asyncio
+import copy
+from unittest.mock import patch, AsyncMock, MagicMock
 import pytest
 
 from homeassistant.core import HomeAssistant
@@ -36,16 +38,50 @@ VALID_NEARBY_STOPS = {
     "description": "Data recovered OK",
     "data": [
         {
-            "stop": "72",
-            "stopName": "Cibeles-Casa de América",
-            "distance": 150,
-            "lines": [{"label": "27"}, {"label": "5"}]
-        },
+            "stops": [
+                {
+                    "stop": "72",
+                    "stopName": "Cibeles-Casa de América",
+                    "distance": 150,
+                    "lines": [{"label": "27"}, {"label": "5"}]
+                },
+                {
+                    "stop": "73",
+                    "stopName": "Recoletos",
+                    "distance": 280,
+                    "lines": [{"label": "14"}]
+                }
+            ],
+        }
+    ],
+}
+
+VALID_STOP_INFO = {
+    "code": "00",
+    "description": "Data recovered OK",
+    "data": [
         {
-            "stop": "73",
-            "stopName": "Recoletos",
-            "distance": 280,
-            "lines": [{"label": "14"}]
+            "stops": [
+                {
+                    "stop": "72",
+                    "name": "Cibeles-Casa de América",
+                    "postalAddress": "Paseo de Recoletos, 2",
+                    "geometry": {"coordinates": [-3.6926, 40.4193]},
+                    "dataLine": [
+                        {
+                            "label": "27",
+                            "headerA": "EMBAJADORES",
+                            "headerB": "PLAZA CASTILLA",
+                            "direction": "B",
+                            "maxFreq": "10",
+                            "minFreq": "5",
+                            "startTime": "06:00",
+                            "stopTime": "23:30",
+                            "dayType": "LA",
+                        }
+                    ],
+                }
+            ],
         }
     ],
 }
@@ -84,6 +120,8 @@ def make_request_mock(url, headers=None, data=None, method="POST"):
         return VALID_LOGIN
     if "arroundxy" in url:
         return VALID_NEARBY_STOPS
+    if "detail" in url:
+        return VALID_STOP_INFO
     if "arrives" in url:
         return VALID_ARRIVALS
     return {"code": "00", "data": []}
@@ -102,7 +140,7 @@ class TestConfigFlow:
         return flow
 
     @patch(
-        "custom_components.emt_madrid.config_flow.APIEMT._make_request",
+        "custom_components.emt_madrid.config_flow.APIEMT._async_make_request",
         side_effect=make_request_mock,
     )
     async def test_user_flow_success(self, mock_request, hass: HomeAssistant) -> None:
@@ -131,7 +169,7 @@ class TestConfigFlow:
         assert result["data"][CONF_RADIUS] == 300
 
     @patch(
-        "custom_components.emt_madrid.config_flow.APIEMT._make_request",
+        "custom_components.emt_madrid.config_flow.APIEMT._async_make_request",
         side_effect=make_request_mock,
     )
     async def test_user_flow_invalid_auth(self, mock_request, hass: HomeAssistant) -> None:
@@ -157,7 +195,7 @@ class TestConfigFlow:
         assert result["errors"]["base"] == "invalid_auth"
 
     @patch(
-        "custom_components.emt_madrid.config_flow.APIEMT._make_request",
+        "custom_components.emt_madrid.config_flow.APIEMT._async_make_request",
         side_effect=make_request_mock,
     )
     async def test_user_flow_no_home_zone(self, mock_request, hass: HomeAssistant) -> None:
@@ -177,7 +215,7 @@ class TestConfigFlow:
         assert result["errors"]["base"] == "no_home_zone"
 
     @patch(
-        "custom_components.emt_madrid.config_flow.APIEMT._make_request",
+        "custom_components.emt_madrid.config_flow.APIEMT._async_make_request",
         side_effect=make_request_mock,
     )
     async def test_user_flow_with_custom_coordinates(self, mock_request, hass: HomeAssistant) -> None:
@@ -223,47 +261,63 @@ class TestConfigFlow:
         assert result["errors"]["base"] == "invalid_stops"
 
 
+    def test_parse_stops(self) -> None:
+        """Test parsing the comma-separated stop IDs."""
+        from custom_components.emt_madrid.config_flow import InvalidStops, _parse_stops
+
+        assert _parse_stops("") == []
+        assert _parse_stops("72, 73,") == [72, 73]
+        for invalid in ("abc, 123", "1a", "1 2", "7.5"):
+            with pytest.raises(InvalidStops):
+                _parse_stops(invalid)
+
+        # A long run of empty entries followed by garbage is still rejected
+        with pytest.raises(InvalidStops):
+            _parse_stops("     ," * 200 + "x")
+
+
 class TestAPIEMT:
     """Test the APIEMT class."""
 
     @patch(
-        "custom_components.emt_madrid.emt_madrid.APIEMT._make_request",
+        "custom_components.emt_madrid.emt_madrid.APIEMT._async_make_request",
         side_effect=make_request_mock,
     )
-    def test_authenticate_success(self, mock_request) -> None:
+    async def test_authenticate_success(self, mock_request) -> None:
         """Test successful authentication."""
         from custom_components.emt_madrid.emt_madrid import APIEMT
 
-        api = APIEMT("test@mail.com", "password123", 0)
-        api.authenticate()
+        api = APIEMT("test@mail.com", "password123", 0, session=MagicMock())
+        await api.async_authenticate()
 
         assert api._token == "3bd5855a-ed3d-41d5-8b4b-182726f86031"
 
     @patch(
-        "custom_components.emt_madrid.emt_madrid.APIEMT._make_request",
+        "custom_components.emt_madrid.emt_madrid.APIEMT._async_make_request",
         side_effect=make_request_mock,
     )
-    def test_authenticate_failure(self, mock_request) -> None:
+    async def test_authenticate_failure(self, mock_request) -> None:
         """Test failed authentication."""
-        from custom_components.emt_madrid.emt_madrid import APIEMT
+        from custom_components.emt_madrid.emt_madrid import APIEMT, EMTAuthError
 
-        api = APIEMT("invalid@email.com", "password123", 0)
-        api.authenticate()
+        api = APIEMT("invalid@email.com", "password123", 0, session=MagicMock())
 
-        assert api._token == "Invalid token"
+        with pytest.raises(EMTAuthError):
+            await api.async_authenticate()
+        assert api._token is None
 
     @patch(
-        "custom_components.emt_madrid.emt_madrid.APIEMT._make_request",
+        "custom_components.emt_madrid.emt_madrid.APIEMT._async_make_request",
         side_effect=make_request_mock,
     )
-    def test_get_stops_from_coordinates(self, mock_request) -> None:
+    async def test_get_stops_from_coordinates(self, mock_request) -> None:
         """Test getting stops from coordinates."""
         from custom_components.emt_madrid.emt_madrid import APIEMT
 
-        api = APIEMT("test@mail.com", "password123", 0)
-        api.authenticate()
+        api = APIEMT("test@mail.com", "password123", 0, session=MagicMock())
+        await api.async_authenticate()
 
-        stops = api.get_stops_from_coordinates(-3.7038, 40.4168, 300)
+        stops = await api.async_get_stops_from_coordinates(-3.7038, 40.4168, 300)
 
         assert len(stops) == 2
         assert stops[0]["stop_id"] == "72"
@@ -272,41 +326,203 @@ class TestAPIEMT:
         assert "27" in stops[0]["lines"]
 
     @patch(
-        "custom_components.emt_madrid.emt_madrid.APIEMT._make_request",
+        "custom_components.emt_madrid.emt_madrid.APIEMT._async_make_request",
         side_effect=make_request_mock,
     )
-    def test_get_nearby_arrivals(self, mock_request) -> None:
+    async def test_get_stops_from_coordinates_cached(self, mock_request) -> None:
+        """Test that repeated lookups for the same location reuse the stops."""
+        from custom_components.emt_madrid.emt_madrid import APIEMT
+
+        api = APIEMT("test@mail.com", "password123", 0, session=MagicMock())
+        await api.async_authenticate()
+
+        first = await api.async_get_stops_from_coordinates(-3.7038, 40.4168, 300)
+        second = await api.async_get_stops_from_coordinates(-3.7038, 40.4168, 300)
+
+        assert first == second
+        stop_calls = [c for c in mock_request.call_args_list if "arroundxy" in c.args[0]]
+        assert len(stop_calls) == 1
+
+    @patch(
+        "custom_components.emt_madrid.emt_madrid.APIEMT._async_make_request",
+        side_effect=make_request_mock,
+    )
+    async def test_get_nearby_arrivals(self, mock_request) -> None:
         """Test getting nearby arrivals."""
         from custom_components.emt_madrid.emt_madrid import APIEMT
 
-        api = APIEMT("test@mail.com", "password123", 0)
-        api.authenticate()
+        api = APIEMT("test@mail.com", "password123", 0, session=MagicMock())
+        await api.async_authenticate()
 
-        arrivals = api.get_nearby_arrivals(-3.7038, 40.4168, 300, 10)
+        arrivals, stops_count = await api.async_get_nearby_arrivals(-3.7038, 40.4168, 300, 10)
 
         assert len(arrivals) > 0
+        assert stops_count == 2
         # Arrivals should be sorted by minutes
         for i in range(len(arrivals) - 1):
-            assert arrivals[i]["minutes"] <= arrivals[i + 1]["minutes"]
+            assert arrivals[i].minutes <= arrivals[i + 1].minutes
         # Check arrival structure
-        assert "line" in arrivals[0]
-        assert "minutes" in arrivals[0]
-        assert "stop_name" in arrivals[0]
+        assert "line" in arrivals[0]._asdict()
+        assert "minutes" in arrivals[0]._asdict()
+        assert "stop_name" in arrivals[0]._asdict()
+        assert arrivals[0].stop_name == "Cibeles-Casa de América"
+
+    @patch(
+        "custom_components.emt_madrid.emt_madrid.APIEMT._async_make_request",
+        side_effect=make_request_mock,
+    )
+    async def test_get_nearby_arrivals_cached(self, mock_request) -> None:
+        """Test that polling the same zone within the TTL is served from memory."""
+        from custom_components.emt_madrid.emt_madrid import APIEMT
+
+        api = APIEMT("test@mail.com", "password123", 0, session=MagicMock())
+        await api.async_authenticate()
+
+        first, _ = await api.async_get_nearby_arrivals(-3.7038, 40.4168, 300, 10)
+        first.append({"line": "99", "minutes": 0})
+        second, _ = await api.async_get_nearby_arrivals(-3.70381, 40.41681, 300, 10)
+
+        assert len(second) == len(first) - 1
+        arrival_calls = [c for c in mock_request.call_args_list if "arrives" in c.args[0]]
+        assert len(arrival_calls) == 2
 
     @patch(
-        "custom_components.emt_madrid.emt_madrid.APIEMT._make_request",
+        "custom_components.emt_madrid.emt_madrid.APIEMT._async_make_request",
         side_effect=make_request_mock,
     )
-    def test_get_nearby_arrivals_invalid_token(self, mock_request) -> None:
+    async def test_get_nearby_arrivals_invalid_token(self, mock_request) -> None:
         """Test getting nearby arrivals with invalid token."""
+        from custom_components.emt_madrid.emt_madrid import APIEMT, EMTAuthError
+
+        api = APIEMT("invalid@email.com", "password123", 0, session=MagicMock())
+        with pytest.raises(EMTAuthError):
+            await api.async_authenticate()
+
+        arrivals = await api.async_get_nearby_arrivals(-3.7038, 40.4168, 300, 10)
+
+        assert arrivals == ([], 0)
+
+    async def test_get_nearby_arrivals_expired_token(self) -> None:
+        """Test that a token rejected after the stops were cached still raises."""
+        from custom_components.emt_madrid.emt_madrid import APIEMT, EMTAuthError
+
+        expired = False
+
+        def request_mock(url, headers=None, data=None, method="POST"):
+            if expired and "arrives" in url:
+                return {"code": "80", "description": "Invalid token", "data": []}
+            return make_request_mock(url, headers, data, method)
+
+        with patch(
+            "custom_components.emt_madrid.emt_madrid.APIEMT._async_make_request",
+            side_effect=request_mock,
+        ):
+            api = APIEMT("test@mail.com", "password123", 0, session=MagicMock())
+            await api.async_authenticate()
+            await api.async_get_stops_from_coordinates(-3.7038, 40.4168, 300)
+
+            expired = True
+            with pytest.raises(EMTAuthError):
+                await api.async_get_nearby_arrivals(-3.7038, 40.4168, 300, 10)
+
+            # The failure must not be cached as an empty result
+            expired = False
+            arrivals, _ = await api.async_get_nearby_arrivals(-3.7038, 40.4168, 300, 10)
+            assert len(arrivals) > 0
+
+    @patch(
+        "custom_components.emt_madrid.emt_madrid.APIEMT._async_make_request",
+        side_effect=make_request_mock,
+    )
+    async def test_update_stop_info_cached(self, mock_request) -> None:
+        """Test that the stop details are fetched once while the arrivals are polled."""
+        from custom_components.emt_madrid.emt_madrid import APIEMT
+
+        api = APIEMT("test@mail.com", "password123", 72, session=MagicMock())
+        await api.async_authenticate()
+
+        for _ in range(2):
+            await api.async_update_stop_info(72)
+            await api.async_update_arrival_times(72)
+
+        stop_info = api.get_stop_info()
+        assert stop_info["bus_stop_name"] == "Cibeles-Casa de América"
+        assert stop_info["lines"]["27"]["arrivals"] == [3]
+        detail_calls = [c for c in mock_request.call_args_list if "detail" in c.args[0]]
+        assert len(detail_calls) == 1
+
+    @patch(
+        "custom_components.emt_madrid.emt_madrid.APIEMT._async_make_request",
+        side_effect=make_request_mock,
+    )
+    async def test_fetch_stop_snapshot(self, mock_request) -> None:
+        """Test that a stop snapshot does not touch the tracked stop."""
         from custom_components.emt_madrid.emt_madrid import APIEMT
 
-        api = APIEMT("invalid@email.com", "password123", 0)
-        api.authenticate()
+        api = APIEMT("test@mail.com", "password123", 0, session=MagicMock())
+        await api.async_authenticate()
+
+        snapshot = await api.async_fetch_stop_snapshot(72)
 
-        arrivals = api.get_nearby_arrivals(-3.7038, 40.4168, 300, 10)
+        assert snapshot["bus_stop_id"] == 72
+        assert snapshot["bus_stop_name"] == "Cibeles-Casa de América"
+        assert snapshot["lines"]["27"]["arrivals"] == [3]
+        assert api.get_stop_info()["bus_stop_name"] is None
+        assert (await api.async_fetch_stop_snapshot(72))["lines"] is not snapshot["lines"]
 
-        assert arrivals == []
+    async def test_fetch_stop_snapshot_skips_missing_estimates(self) -> None:
+        """Test that arrivals without an estimate never reach the stored lines."""
+        from custom_components.emt_madrid.emt_madrid import APIEMT
+
+        def request_mock(url, headers=None, data=None, method="POST"):
+            if "arrives" in url:
+                response = copy.deepcopy(VALID_ARRIVALS)
+                response["data"][0]["Arrive"].insert(0, {"line": "27", "estimateArrive": None})
+                return response
+            return make_request_mock(url, headers, data, method)
+
+        with patch(
+            "custom_components.emt_madrid.emt_madrid.APIEMT._async_make_request",
+            side_effect=request_mock,
+        ):
+            api = APIEMT("test@mail.com", "password123", 0, session=MagicMock())
+            await api.async_authenticate()
+            snapshot = await api.async_fetch_stop_snapshot(72)
+
+        assert snapshot["lines"]["27"]["arrivals"] == [3]
+        assert snapshot["lines"]["27"]["distance"] == [674]
+
+    async def test_fetch_stop_snapshot_expired_token(self) -> None:
+        """Test that an extra stop snapshot raises when the token was rejected."""
+        from custom_components.emt_madrid.emt_madrid import APIEMT, EMTAuthError
+
+        def request_mock(url, headers=None, data=None, method="POST"):
+            if "arrives" in url:
+                return {"code": "80", "description": "Invalid token", "data": []}
+            return make_request_mock(url, headers, data, method)
+
+        with patch(
+            "custom_components.emt_madrid.emt_madrid.APIEMT._async_make_request",
+            side_effect=request_mock,
+        ):
+            api = APIEMT("test@mail.com", "password123", 0, session=MagicMock())
+            await api.async_authenticate()
+            with pytest.raises(EMTAuthError):
+                await api.async_fetch_stop_snapshot(72)
+
+    def test_cache_evicts_least_recently_used(self) -> None:
+        """Test that a location read recently survives a full cache."""
+        from custom_components.emt_madrid.emt_madrid import CACHE_SIZE, _cache_get, _cache_put
+
+        cache: dict = {}
+        for i in range(CACHE_SIZE):
+            _cache_put(cache, (i,), i)
+
+        assert _cache_get(cache, (0,), 60) == 0
+        _cache_put(cache, (CACHE_SIZE,), CACHE_SIZE)
+
+        assert _cache_get(cache, (0,), 60) == 0
+        assert _cache_get(cache, (1,), 60) is None
 
 
 class TestSpeechFormatting:
@@ -374,3 +590,483 @@ class TestSpeechFormatting:
         ]
         result = _format_arrivals_for_speech(arrivals)
         assert result == "Línea 27 en 3 minutos y Línea 5 en 7 minutos."
+
+
+class TestTokenCache:
+    """Test the token handling of the entry API client used by the service."""
+
+    def _make_api(self):
+        """Build an API client that has not logged in yet."""
+        from custom_components.emt_madrid.emt_madrid import APIEMT
+
+        return APIEMT("test@mail.com", "password123", 0, session=MagicMock())
+
+    @patch(
+        "custom_components.emt_madrid.emt_madrid.APIEMT._async_make_request",
+        side_effect=make_request_mock,
+    )
+    async def test_token_reused_between_calls(self, mock_request) -> None:
+        """Test that a valid token is not re-authenticated."""
+        api = self._make_api()
+
+        first = await api.async_ensure_token()
+        second = await api.async_ensure_token()
+
+        assert first == second == "3bd5855a-ed3d-41d5-8b4b-182726f86031"
+        login_calls = [c for c in mock_request.call_args_list if "login" in c.args[0]]
+        assert len(login_calls) == 1
+
+    @patch(
+        "custom_components.emt_madrid.emt_madrid.APIEMT._async_make_request",
+        side_effect=make_request_mock,
+    )
+    async def test_rejected_token_forces_login(self, mock_request) -> None:
+        """Test that only the currently rejected token triggers a new login."""
+        api = self._make_api()
+        token = await api.async_ensure_token()
+
+        await api.async_ensure_token(rejected_token="stale-token")
+        await api.async_ensure_token(rejected_token=token)
+
+        login_calls = [c for c in mock_request.call_args_list if "login" in c.args[0]]
+        assert len(login_calls) == 2
+
+
+class TestServiceSchema:
+    """Test the nearby arrivals service schema."""
+
+    def test_coerces_and_defaults(self) -> None:
+        """Test that numeric strings are coerced and defaults applied."""
+        from custom_components.emt_madrid import SERVICE_NEARBY_ARRIVALS_SCHEMA
+
+        result = SERVICE_NEARBY_ARRIVALS_SCHEMA({"radius": "500"})
+        assert result["radius"] == 500
+        assert result["max_results"] == 5
+        assert "radius" not in SERVICE_NEARBY_ARRIVALS_SCHEMA({})
+
+    def test_rejects_out_of_range(self) -> None:
+        """Test that values outside the allowed range are rejected."""
+        import voluptuous as vol
+
+        from custom_components.emt_madrid import SERVICE_NEARBY_ARRIVALS_SCHEMA
+
+        with pytest.raises(vol.Invalid):
+            SERVICE_NEARBY_ARRIVALS_SCHEMA({"radius": 2000})
+        with pytest.raises(vol.Invalid):
+            SERVICE_NEARBY_ARRIVALS_SCHEMA({"max_results": "many"})
+
+
+class TestPolledArrivals:
+    """Test serving the service from the coordinator data."""
+
+    def _setup_coordinator(self, hass):
+        """Register a config entry whose coordinator polled zone.home."""
+        entry = MagicMock(entry_id="entry1")
+        coordinator = MagicMock(last_update_success=True)
+        coordinator.data = {
+            "latitude": 40.4168,
+            "longitude": -3.7038,
+            "radius": 300,
+            "nearby": [{"line": "27", "minutes": 3}, {"line": "5", "minutes": 7}],
+        }
+        hass.config_entries.async_entries = MagicMock(return_value=[entry])
+        hass.data[DOMAIN] = {"entry1": {"coordinator": coordinator}}
+
+    def test_matching_location_served_from_coordinator(self, hass: HomeAssistant) -> None:
+        """Test that the polled zone is reused for the same location."""
+        from custom_components.emt_madrid import _async_get_polled_arrivals
+
+        self._setup_coordinator(hass)
+
+        arrivals = _async_get_polled_arrivals(hass, -3.70381, 40.41681, 300, 1)
+
+        assert arrivals == [{"line": "27", "minutes": 3}]
+
+    def test_other_location_not_served(self, hass: HomeAssistant) -> None:
+        """Test that ad-hoc coordinates fall back to a direct fetch."""
+        from custom_components.emt_madrid import _async_get_polled_arrivals
+
+        self._setup_coordinator(hass)
+
+        assert _async_get_polled_arrivals(hass, -3.69, 40.42, 300, 5) is None
+        assert _async_get_polled_arrivals(hass, -3.7038, 40.4168, 500, 5) is None
+
+
+class TestAgeArrivals:
+    """Test counting down estimates between full fetches."""
+
+    def test_counts_down_and_drops_departed(self) -> None:
+        """Test that estimates are shifted and buses already gone are dropped."""
+        from custom_components.emt_madrid.coordinator import _age_arrivals
+        from custom_components.emt_madrid.emt_madrid import Arrival
+
+        arrivals = [
+            Arrival("Cibeles", "72", 150, "27", "PLAZA CASTILLA", 1, 300),
+            Arrival("Cibeles", "72", 150, "5", "CHAMARTIN", 7, 1200),
+        ]
+
+        aged = _age_arrivals(arrivals, 2)
+
+        assert [(a.line, a.minutes) for a in aged] == [("5", 5)]
+        assert arrivals[1].minutes == 7
+
+    def test_capped_estimates_not_counted_down(self) -> None:
+        """Test that buses reported at the 45 minute cap keep their estimate."""
+        from custom_components.emt_madrid.coordinator import _age_arrivals
+        from custom_components.emt_madrid.emt_madrid import Arrival
+
+        arrivals = [
+            Arrival("Cibeles", "72", 150, "27", "PLAZA CASTILLA", 44, 9000),
+            Arrival("Cibeles", "72", 150, "5", "CHAMARTIN", 45, None),
+        ]
+
+        aged = _age_arrivals(arrivals, 3)
+
+        assert [(a.line, a.minutes) for a in aged] == [("27", 41), ("5", 45)]
+
+
+class TestCoordinator:
+    """Test merging the nearby and extra-stop arrivals in the coordinator."""
+
+    def _setup_coordinator(self, hass, extra_stops):
+        """Create a coordinator polling zone.home with a mocked API."""
+        from custom_components.emt_madrid.coordinator import EMTMadridCoordinator
+        from custom_components.emt_madrid.emt_madrid import Arrival
+
+        hass.states.async_set("zone.home", "zoning", {"latitude": 40.4168, "longitude": -3.7038})
+        api = MagicMock()
+        api.async_ensure_token = AsyncMock()
+        api.async_get_nearby_arrivals = AsyncMock(
+            return_value=(
+                [
+                    Arrival("Cibeles", 72, 150, "27", "PLAZA CASTILLA", 5, 800),
+                    Arrival("Cibeles", 72, 150, "5", "CHAMARTIN", 9, 2100),
+                ],
+                1,
+            )
+        )
+        api.async_fetch_stop_snapshot = AsyncMock(
+            return_value={
+                "bus_stop_name": "Sol",
+                "lines": {"3": {"destination": "PUERTA TOLEDO", "arrivals": [2, 12], "distance": [400]}},
+            }
+        )
+        return EMTMadridCoordinator(hass, api, {CONF_RADIUS: 300, CONF_STOPS: extra_stops}), api
+
+    async def test_merges_extra_stops_in_order(self, hass: HomeAssistant) -> None:
+        """Test that extra-stop arrivals are merged with the nearby ones by minutes."""
+        coordinator, _ = self._setup_coordinator(hass, [1234])
+
+        data = await coordinator._async_update_data()
+
+        assert [(a.line, a.minutes) for a in data["arrivals"]] == [
+            ("3", 2), ("27", 5), ("5", 9), ("3", 12)
+        ]
+        assert data["arrivals"][0].stop_name == "Sol"
+        assert data["arrivals"][0].bus_distance == 400
+        assert data["arrivals"][-1].bus_distance is None
+        assert [a.line for a in data["nearby"]] == ["27", "5"]
+        assert data["stops_count"] == 2
+
+    async def test_failing_extra_stop_is_skipped(self, hass: HomeAssistant) -> None:
+        """Test that one failing extra stop does not fail the whole poll."""
+        coordinator, api = self._setup_coordinator(hass, [1234, 5678, 9999])
+        snapshot = api.async_fetch_stop_snapshot.return_value
+
+        def fetch_stop(stop_id):
+            if stop_id == 5678:
+                raise ValueError("Unexpected response")
+            return snapshot if stop_id == 1234 else {"bus_stop_name": "Empty", "lines": {}}
+
+        api.async_fetch_stop_snapshot.side_effect = fetch_stop
+
+        data = await coordinator._async_update_data()
+
+        assert {a.stop_name for a in data["arrivals"]} == {"Cibeles", "Sol"}
+        # Only stops with arrivals count, the failing and the empty one do not
+        assert data["stops_count"] == 2
+
+    async def test_extra_stops_fetched_below_client_cap(self, hass: HomeAssistant) -> None:
+        """Test that extra stops never hold all of the client's request slots."""
+        from custom_components.emt_madrid.coordinator import MAX_CONCURRENT_STOPS
+        from custom_components.emt_madrid.emt_madrid import MAX_CONCURRENT_REQUESTS
+
+        coordinator, api = self._setup_coordinator(hass, list(range(1, 13)))
+        in_flight = peak = 0
+
+        async def fetch_stop(stop_id):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0)
+            in_flight -= 1
+            return {"bus_stop_name": "Sol", "lines": {}}
+
+        api.async_fetch_stop_snapshot.side_effect = fetch_stop
+
+        await coordinator._async_update_data()
+
+        assert peak == MAX_CONCURRENT_STOPS < MAX_CONCURRENT_REQUESTS
+
+    async def test_rejected_token_logs_in_once(self, hass: HomeAssistant) -> None:
+        """Test that a rejected token triggers a single login and a retry."""
+        from custom_components.emt_madrid.emt_madrid import EMTAuthError
+
+        coordinator, api = self._setup_coordinator(hass, [1234])
+        api.async_ensure_token.return_value = "expired"
+        nearby = api.async_get_nearby_arrivals.return_value
+        api.async_get_nearby_arrivals.side_effect = [EMTAuthError("Invalid token"), nearby]
+
+        data = await coordinator._async_update_data()
+
+        assert data["stops_count"] == 2
+        assert api.async_ensure_token.await_count == 2
+        assert api.async_ensure_token.await_args.kwargs == {"rejected_token": "expired"}
+
+    async def test_rejected_token_after_login_fails_update(self, hass: HomeAssistant) -> None:
+        """Test that a token rejected again after the login fails the update."""
+        from homeassistant.helpers.update_coordinator import UpdateFailed
+        from custom_components.emt_madrid.emt_madrid import EMTAuthError
+
+        coordinator, api = self._setup_coordinator(hass, [1234])
+        api.async_fetch_stop_snapshot.side_effect = EMTAuthError("Invalid token")
+
+        with pytest.raises(UpdateFailed):
+            await coordinator._async_update_data()
+
+        assert api.async_ensure_token.await_count == 2
+        assert coordinator._fetched is None
+
+    async def test_estimates_counted_down_between_fetches(self, hass: HomeAssistant) -> None:
+        """Test that polls inside the refresh window age the last fetch."""
+        coordinator, api = self._setup_coordinator(hass, [1234])
+        coordinator.refresh_every = 5
+
+        with patch("custom_components.emt_madrid.coordinator.monotonic", return_value=1000.0):
+            await coordinator._async_update_data()
+        with patch("custom_components.emt_madrid.coordinator.monotonic", return_value=1130.0):
+            data = await coordinator._async_update_data()
+
+        assert api.async_get_nearby_arrivals.await_count == 1
+        assert [(a.line, a.minutes) for a in data["arrivals"]] == [
+            ("3", 0), ("27", 3), ("5", 7), ("3", 10)
+        ]
+        assert [(a.line, a.minutes) for a in data["nearby"]] == [("27", 3), ("5", 7)]
+
+    async def test_early_scheduled_polls_counted_down(self, hass: HomeAssistant) -> None:
+        """Test that polls firing just under a minute apart still count a minute each."""
+        coordinator, api = self._setup_coordinator(hass, [])
+        coordinator.refresh_every = 3
+
+        with patch("custom_components.emt_madrid.coordinator.monotonic", return_value=1000.0):
+            await coordinator._async_update_data()
+        with patch("custom_components.emt_madrid.coordinator.monotonic", return_value=1059.9):
+            first = await coordinator._async_update_data()
+        with patch("custom_components.emt_madrid.coordinator.monotonic", return_value=1119.9):
+            second = await coordinator._async_update_data()
+
+        assert api.async_get_nearby_arrivals.await_count == 1
+        assert [a.minutes for a in first["arrivals"]] == [4, 8]
+        assert [a.minutes for a in second["arrivals"]] == [3, 7]
+
+    async def test_full_fetch_after_refresh_window(self, hass: HomeAssistant) -> None:
+        """Test that the API is polled again once the refresh window is over."""
+        coordinator, api = self._setup_coordinator(hass, [1234])
+        coordinator.refresh_every = 5
+
+        with patch("custom_components.emt_madrid.coordinator.monotonic", return_value=1000.0):
+            await coordinator._async_update_data()
+        # A scheduled poll firing slightly early still counts as the next full fetch
+        with patch("custom_components.emt_madrid.coordinator.monotonic", return_value=1298.0):
+            data = await coordinator._async_update_data()
+
+        assert api.async_get_nearby_arrivals.await_count == 2
+        assert api.async_fetch_stop_snapshot.await_count == 2
+        assert [(a.line, a.minutes) for a in data["arrivals"]] == [
+            ("3", 2), ("27", 5), ("5", 9), ("3", 12)
+        ]
+
+
+class TestNearbySensor:
+    """Test the nearby arrivals sensor."""
+
+    ARRIVALS = [
+        ("Cibeles", 72, 150, "27", "PLAZA CASTILLA", 3, 800),
+        ("Cibeles", 72, 150, "5", "CHAMARTIN", 7, 2100),
+    ]
+
+    def _data(self, arrivals=ARRIVALS):
+        """Build coordinator data with the given arrivals."""
+        from custom_components.emt_madrid.emt_madrid import Arrival
+
+        return {
+            "latitude": 40.4168,
+            "longitude": -3.7038,
+            "radius": 300,
+            "nearby": [],
+            "arrivals": [Arrival(*arrival) for arrival in arrivals],
+            "stops_count": 1,
+        }
+
+    def _make_sensor(self, arrivals=ARRIVALS):
+        """Create a sensor on a coordinator that already polled."""
+        from custom_components.emt_madrid.sensor import EMTNearbyArrivalsSensor
+
+        coordinator = MagicMock(last_update_success=True, radius=300, extra_stops=[])
+        coordinator.data = self._data(arrivals)
+        return EMTNearbyArrivalsSensor(coordinator=coordinator, entry_id="entry1")
+
+    def test_identical_update_not_written(self) -> None:
+        """Test that a poll returning the same buses does not write the state."""
+        sensor = self._make_sensor()
+        sensor.coordinator.data = self._data()
+
+        with patch.object(sensor, "async_write_ha_state") as write:
+            sensor._handle_coordinator_update()
+
+        write.assert_not_called()
+
+    def test_changed_bus_distance_written(self) -> None:
+        """Test that a bus getting closer is written even at the same minutes."""
+        sensor = self._make_sensor()
+        closer = [self.ARRIVALS[0][:6] + (600,), self.ARRIVALS[1]]
+        sensor.coordinator.data = self._data(closer)
+
+        with patch.object(sensor, "async_write_ha_state") as write:
+            sensor._handle_coordinator_update()
+
+        write.assert_called_once()
+        assert sensor.extra_state_attributes["arrivals"][0]["bus_distance"] == 600
+
+    def test_changed_availability_written(self) -> None:
+        """Test that a failed poll is written even though the data is unchanged."""
+        sensor = self._make_sensor()
+        sensor.coordinator.last_update_success = False
+
+        with patch.object(sensor, "async_write_ha_state") as write:
+            sensor._handle_coordinator_update()
+            sensor._handle_coordinator_update()
+
+        write.assert_called_once()
+
+    def test_speech_joins_lines(self) -> None:
+        """Test the speech wording for one, two and more lines."""
+        one = self._make_sensor(self.ARRIVALS[:1])
+        two = self._make_sensor()
+        three = self._make_sensor(self.ARRIVALS + [("Sol", 1234, None, "3", "PUERTA TOLEDO", 0, 50)])
+
+        assert one.extra_state_attributes["speech"] == "Línea 27 en 3 minutos en Cibeles."
+        assert two.extra_state_attributes["speech"] == (
+            "Línea 27 en 3 minutos en Cibeles y Línea 5 en 7 minutos en Cibeles."
+        )
+        assert three.extra_state_attributes["speech"] == (
+            "Línea 27 en 3 minutos en Cibeles, Línea 5 en 7 minutos en Cibeles, "
+            "y Línea 3 llegando ahora en Sol."
+        )
+
+    def test_speech_skips_repeated_lines(self) -> None:
+        """Test that only the soonest bus of a line is mentioned."""
+        arrivals = [("Cibeles", 72, 150, "27", "PLAZA CASTILLA", minutes, None) for minutes in range(1, 40)]
+        arrivals.append(("Cibeles", 72, 150, "5", "CHAMARTIN", 42, None))
+
+        sensor = self._make_sensor(arrivals)
+
+        assert sensor.extra_state_attributes["speech"] == (
+            "Línea 27 en 1 minuto en Cibeles y Línea 5 en 42 minutos en Cibeles."
+        )
+
+    def test_speech_mentions_five_lines(self) -> None:
+        """Test that the speech stops after five different lines."""
+        arrivals = [(None, 72, 150, str(line), "CENTRO", line, None) for line in range(1, 8)]
+
+        sensor = self._make_sensor(arrivals)
+
+        assert sensor.extra_state_attributes["speech"] == (
+            "Línea 1 en 1 minuto, Línea 2 en 2 minutos, Línea 3 en 3 minutos, "
+            "Línea 4 en 4 minutos, y Línea 5 en 5 minutos."
+        )
+
+    def test_speech_without_arrivals(self) -> None:
+        """Test the speech when no bus is coming."""
+        sensor = self._make_sensor([])
+
+        assert sensor.extra_state_attributes["speech"] == (
+            "No hay autobuses llegando a paradas cercanas en este momento."
+        )
+
+
+class TestNearbyArrivalsService:
+    """Test the nearby arrivals service handler."""
+
+    async def test_default_radius_uses_entry(self, hass: HomeAssistant) -> None:
+        """Test that a call without radius reuses the poll of a 500 m entry."""
+        from custom_components.emt_madrid import (
+            SERVICE_NEARBY_ARRIVALS_SCHEMA,
+            _async_register_services,
+        )
+        from custom_components.emt_madrid.emt_madrid import Arrival
+
+        api = MagicMock()
+        coordinator = MagicMock(last_update_success=True)
+        coordinator.data = {
+            "latitude": 40.4168,
+            "longitude": -3.7038,
+            "radius": 500,
+            "nearby": [Arrival("Cibeles", "72", 450, "27", "PLAZA CASTILLA", 3, 674)],
+        }
+        entry = MagicMock(entry_id="entry1")
+        hass.config_entries.async_entries = MagicMock(return_value=[entry])
+        hass.data[DOMAIN] = {
+            "entry1": {"api": api, "coordinator": coordinator, "config": {CONF_RADIUS: 500}}
+        }
+        hass.states.async_set("zone.home", "zoning", {"latitude": 40.4168, "longitude": -3.7038})
+
+        await _async_register_services(hass)
+        handler = hass.services.async_register.call_args.args[2]
+        response = await handler(MagicMock(data=SERVICE_NEARBY_ARRIVALS_SCHEMA({})))
+
+        assert response["count"] == 1
+        assert response["arrivals"][0]["line"] == "27"
+        api.async_get_nearby_arrivals.assert_not_called()
+
+    async def test_home_coords_cached_until_core_config_update(self, hass: HomeAssistant) -> None:
+        """Test that zone.home is resolved once until the core config changes."""
+        from homeassistant.const import EVENT_CORE_CONFIG_UPDATE
+        from custom_components.emt_madrid import SERVICE_NEARBY_ARRIVALS_SCHEMA, async_setup
+        from custom_components.emt_madrid.emt_madrid import Arrival
+
+        api = MagicMock()
+        api.async_ensure_token = AsyncMock(return_value="token")
+        api.async_get_nearby_arrivals = AsyncMock(return_value=([], 0))
+        coordinator = MagicMock(last_update_success=True)
+        coordinator.data = {
+            "latitude": 40.4168,
+            "longitude": -3.7038,
+            "radius": 300,
+            "nearby": [Arrival("Cibeles", "72", 150, "27", "PLAZA CASTILLA", 3, 674)],
+        }
+        entry = MagicMock(entry_id="entry1")
+        hass.config_entries.async_entries = MagicMock(return_value=[entry])
+        hass.states.async_set("zone.home", "zoning", {"latitude": 40.4168, "longitude": -3.7038})
+
+        await async_setup(hass, {})
+        hass.data[DOMAIN]["entry1"] = {
+            "api": api, "coordinator": coordinator, "config": {CONF_RADIUS: 300}
+        }
+        handler = hass.services.async_register.call_args.args[2]
+        event_type, clear_home_coords = hass.bus.async_listen.call_args.args
+        call = MagicMock(data=SERVICE_NEARBY_ARRIVALS_SCHEMA({}))
+
+        with patch.object(hass.states, "get", wraps=hass.states.get) as get_state:
+            await handler(call)
+            await handler(call)
+            assert get_state.call_count == 1
+
+            # Moving the home location fires a core config update
+            hass.states.async_set("zone.home", "zoning", {"latitude": 40.42, "longitude": -3.69})
+            assert event_type == EVENT_CORE_CONFIG_UPDATE
+            clear_home_coords(MagicMock())
+            await handler(call)
+
+        assert get_state.call_count == 2
+        api.async_get_nearby_arrivals.assert_awaited_once_with(-3.69, 40.42, 300, 5)